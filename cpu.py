@@ -1,6 +1,9 @@
-from opcodes6502 import opcodes
+from array import array
+from functools import partial
+
+from opcodes6502 import opcodes, opcodes_table, lengths
 from byte_math import signed_byte_to_int
-from cpu_helper import imm, zp, zpx, abs, absxy, indx, indy
+from cpu_helper import indx, indy
 import ppu as graphics
 
 class Memory:
@@ -26,31 +29,40 @@ class Memory:
 		0xFFFE - 0xFFFF: IRQ vector
 	"""
 	
-	mem = bytearray(0xFFFF+1)
-	is_mirror = False
-	ppu = None
+	SIZE = 0xFFFF+1
+	
+	__slots__ = ("mem", "is_mirror", "ppu", "_amap", "_is_ppu_reg", "_writable")
 	
 	def __init__(self, mem, is_mirror = False):
-		if len(mem) != len(self.mem):
-			raise Exception(f"Memory::__init__: Invalid memory length, expecting {len(self.mem)}, got {len(mem)}")
+		if len(mem) != Memory.SIZE:
+			raise Exception(f"Memory::__init__: Invalid memory length, expecting {Memory.SIZE}, got {len(mem)}")
 			
 		self.mem = mem
 		self.is_mirror = is_mirror
+		self.ppu = None
+		
+		# Precompute the mapping of every address, so reads and writes are a lookup
+		self._amap = array("H", (self.map_byte(byte) for byte in range(Memory.SIZE)))
+		self._is_ppu_reg = bytearray(Memory.SIZE)
+		self._writable = bytearray(Memory.SIZE)
+		for byte in range(Memory.SIZE):
+			if self._amap[byte] in graphics.REGISTERS:
+				self._is_ppu_reg[byte] = 1
+			elif byte < 0x8000:
+				# Plain memory, i.e. not a PPU register or ROM
+				self._writable[byte] = 1
 	
 	def _set_ppu(self, ppu):
 		self.ppu = ppu
 		
-	def page_num(self, addr):
-		return addr // 0xFF
-		
 	def map_byte(self, byte):
 		# 0x0000 - 0x1FFF (4 mirrors)
 		if byte >= 0 and byte <= 0x1FFF:
-			return byte % 0x0800
+			return byte & 0x07FF
 		
 		# 0x2000 - 0x3FFF (8 byte mirrors)
 		if byte >= 0x2000 and byte <= 0x3FFF:
-			return ((byte - 0x2000) % 0x08) + 0x2000
+			return ((byte - 0x2000) & 0x07) + 0x2000
 		
 		# 0x8000 - 0xFFFF (mirror if required)
 		if self.is_mirror and byte >= 0xC000 and byte <= 0xFFFF:
@@ -60,139 +72,183 @@ class Memory:
 		return byte
 		
 	def read(self, byte):
-		mapped = self.map_byte(byte)
-		
-		if mapped in graphics.REGISTERS:
+		if self._is_ppu_reg[byte]:
 			#print(f"Mem read at byte {byte:04X} in PPU")
 			return self.ppu.handle_read(byte)
 		
-		return self.mem[mapped]
+		return self.mem[self._amap[byte]]
 	
-	def write(self, byte, data):
-		if byte >= 0x8000:
-			print(f"Memory::write: Trying to write {data} at 0x{byte:04X} in Read-Only Memory")
-			return
-		
-		mapped = self.map_byte(byte)
-		
-		if mapped in graphics.REGISTERS:
-			#print(f"Mem write at byte {byte:04X} in PPU")
-			return self.ppu.handle_write(byte, data)
-		
-		self.mem[mapped] = data % 0x100
+	def read_word(self, byte):
+		"""Read the little-endian word at byte, wrapping at the end of memory"""
+		next_byte = (byte + 1) & 0xFFFF
+		if self._is_ppu_reg[byte] or self._is_ppu_reg[next_byte]:
+			return self.read(byte) | (self.read(next_byte) << 8)
 		
-class Flag:
-	N = 128	# Negative
-	V = 64	# Overflow
-	_ = 32	# unused
-	B = 16	# 
-	D = 8	# Decimal mode
-	I = 4	# Interrupt disable
-	Z = 2	# Zero
-	C = 1	# Carry
+		return self.mem[self._amap[byte]] | (self.mem[self._amap[next_byte]] << 8)
 	
-	INIT_FLAGS = [_, I]
-	VALUES = [N, V, _, B, D, I, Z, C]
+	def read_word_zp(self, byte):
+		"""Read the little-endian word at zero page byte, wrapping within the zero page"""
+		# The zero page is plain, unmirrored RAM
+		return self.mem[byte] | (self.mem[(byte + 1) & 0xFF] << 8)
 	
-	# See: https://stackoverflow.com/questions/16913423/why-is-the-initial-state-of-the-interrupt-flag-of-the-6502-a-1
-	enabled_flags = INIT_FLAGS[:]
+	def write(self, byte, data):
+		if self._writable[byte]:
+			self.mem[self._amap[byte]] = data & 0xFF
+		elif self._is_ppu_reg[byte]:
+			#print(f"Mem write at byte {byte:04X} in PPU")
+			self.ppu.handle_write(byte, data)
+		
+		# Writes to Read-Only Memory are ignored
+		
+# Processor flags, as stored in the NV-BDIZC status byte CPU.p
+N = 0x80	# Negative
+V = 0x40	# Overflow
+U = 0x20	# unused, always set
+B = 0x10	# 
+D = 0x08	# Decimal mode
+I = 0x04	# Interrupt disable
+Z = 0x02	# Zero
+C = 0x01	# Carry
+
+def flags_to_str(byte):
+	flags = ["N", "V", "_", "B", "D", "I", "Z", "C"]
+	values = [N, V, U, B, D, I, Z, C]
 	
-	@staticmethod
-	def byte_to_str(byte):
-		flags = ["N", "V", "_", "B", "D", "I", "Z", "C"]
-		values = Flag.VALUES
-		
-		set_flags = [flags[index] for index, value in enumerate(values) if byte & value]
-		
-		return " ".join(set_flags)
+	set_flags = [flags[index] for index, value in enumerate(values) if byte & value]
 	
-	def __str__(self):
-		return f"Flags: (0x{self.get_byte():02X}) [{Flag.byte_to_str(self.get_byte())}]"
+	return " ".join(set_flags)
+
+# Masks for clearing several flags in one go
+_NZC_CLR = 0xFF ^ (N | Z | C)
+_NVZ_CLR = 0xFF ^ (N | V | Z)
+_NZCV_CLR = 0xFF ^ (N | Z | C | V)
+
+# Branch offsets: operand byte -> signed offset
+_SIGNED = [signed_byte_to_int(byte, 8) for byte in range(0x100)]
+
+# Branch opcodes: (flag to test, value it must have for the branch to be taken)
+_BRANCH_TABLE = {
+	0x90: (C, 0),		# BCC
+	0xB0: (C, C),	# BCS
+	0xF0: (Z, Z),	# BEQ
+	0x30: (N, N),	# BMI
+	0xD0: (Z, 0),		# BNE
+	0x10: (N, 0),		# BPL
+	0x50: (V, 0),		# BVC
+	0x70: (V, V),	# BVS
+}
+
+## Addressing modes
+#
+# Each takes the cpu and the raw operand, and returns the effective address.
+# Whether indexing crossed a page follows from the address itself, see
+# _MODE_PAGE_CROSSED.
+
+def _addr_direct(cpu, addr):
+	return addr
+
+def _addr_zpx(cpu, addr):
+	return (addr + cpu.x) & 0xFF
+
+def _addr_zpy(cpu, addr):
+	return (addr + cpu.y) & 0xFF
+
+def _addr_absx(cpu, addr):
+	return (addr + cpu.x) & 0xFFFF
+
+def _addr_absy(cpu, addr):
+	return (addr + cpu.y) & 0xFFFF
+
+def _addr_indx(cpu, addr):
+	# https://www.c64-wiki.com/wiki/Indexed-indirect_addressing
+	return indx(addr, cpu.mem, cpu.x)
+
+def _addr_indy(cpu, addr):
+	# https://www.c64-wiki.com/wiki/Indirect-indexed_addressing
+	return indy(addr, cpu.mem, cpu.y) & 0xFFFF
+
+# Opcodes in the 0bxxxxxx01 and 0bxxxxxx11 columns encode their addressing
+# mode in bits 2-4; LAX and SAX index with y where the others use x
+_COLUMN_MODES = (_addr_indx, _addr_direct, None, _addr_direct, _addr_indy, _addr_zpx, _addr_absy, _addr_absx)
+_COLUMN_MODES_Y = (_addr_indx, _addr_direct, None, _addr_direct, _addr_indy, _addr_zpy, _addr_absy, _addr_absy)
+
+# Opcode byte -> addressing mode, for the instructions that resolve it through this table
+_ADDR_MODE = [None] * 0x100
+for _byte, _instr in opcodes.items():
+	if _instr[0] in ("iDCP", "iISC", "iRLA", "iRRA", "iSLO", "iSRE"):
+		_ADDR_MODE[_byte] = _COLUMN_MODES[(_byte >> 2) & 0x07]
+	elif _instr[0] in ("iLAX", "iSAX"):
+		_ADDR_MODE[_byte] = _COLUMN_MODES_Y[(_byte >> 2) & 0x07]
+
+class CPU:
+	# Useful: http://www.emulator101.com/6502-addressing-modes.html
+	# http://www.obelisk.me.uk/6502/reference.html
+	
+	# Print every executed instruction (set CPU.trace = True to enable)
+	trace = False
 	
-	def get_byte(self):
-		return sum(self.enabled_flags)
+	# Fixed set of state attributes, so every register access is a slot lookup
+	__slots__ = ("sp", "pc", "p", "acc", "x", "y", "cycles", "mem", "ppu", "_dispatch", "_threaded", "_rom_operands")
 	
-	def set_byte(self, byte):
-		self.enabled_flags = Flag.INIT_FLAGS[:]
+	def __init__(self, mem):
+		self.sp = 0xFD					# Stack pointer (8-bit)
+		self.pc = 0						# Program counter (16-bit)
+		self.acc = 0					# Accumulator (8-bit)
+		self.x = 0						# X register (8-bit)
+		self.y = 0						# Y register (8-bit)
+		self.cycles = 0
 		
-		if byte & Flag.N:
-			self.set(Flag.N)
+		# See: https://stackoverflow.com/questions/16913423/why-is-the-initial-state-of-the-interrupt-flag-of-the-6502-a-1
+		self.p = U | I					# Processor flags NV-BDIZC (8-bit)
 		
-		if byte & Flag.V:
-			self.set(Flag.V)
+		self.mem = mem
+		self.pc = self.reset_vector()
+		self.ppu = graphics.PPU()
 		
-		if byte & Flag._:
-			self.set(Flag._)
+		self.mem._set_ppu(self.ppu)
 		
-		if byte & Flag.B:
-			self.set(Flag.B)
+		# Resolve the handler of every opcode once, rather than on each instruction
+		self._dispatch = [self.instruction_not_implemented] * 256
+		for byte, instr in opcodes.items():
+			self._dispatch[byte] = getattr(self, "instruction_" + instr[0], self.instruction_not_implemented)
 		
-		if byte & Flag.D:
-			self.set(Flag.D)
+		for byte, name in SPECIALIZED.items():
+			self._dispatch[byte] = getattr(self, name)
 		
-		if byte & Flag.I:
-			self.set(Flag.I)
+		for byte, (flag, expected) in _BRANCH_TABLE.items():
+			self._dispatch[byte] = partial(self._branch, flag, expected)
 		
-		if byte & Flag.Z:
-			self.set(Flag.Z)
-			
-		if byte & Flag.C:
-			self.set(Flag.C)
-	
-	def isset(self, flag):
-		return flag in self.enabled_flags
-	
-	def set(self, flag):
-		if not self.isset(flag):
-			self.enabled_flags.append(flag)
-			return True
+		# BRK stops the emulation for now, rather than running instruction_BRK
+		self._dispatch[0x00] = self._halt
 		
-		return False
-	
-	def clear(self, flag):
-		if self.isset(flag):
-			self.enabled_flags.remove(flag)
-			return True
+		# The JAM opcodes lock up the processor, they all share one trap
+		for byte, instr in opcodes.items():
+			if instr[0] == "iJAM":
+				self._dispatch[byte] = self._jam_trap
 		
-		return False
-	
-	def toggle(self, flag):
-		if self.isset(flag):
-			return self.clear(flag)
+		# PRG ROM never changes, so the (up to) two operand bytes following every
+		# ROM address are decoded once, as a little-endian word indexed by pc
+		raw = mem.mem
+		amap = mem._amap
+		self._rom_operands = array("H", bytes(2 * Memory.SIZE))
+		for pc in range(0x8000, 0xFFFF):
+			self._rom_operands[pc] = raw[amap[pc + 1]] | ((raw[amap[pc + 2]] << 8) if pc < 0xFFFE else 0)
 		
-		return self.set(flag)
-
-class CPU:
-	# Useful: http://www.emulator101.com/6502-addressing-modes.html
-	# http://www.obelisk.me.uk/6502/reference.html
-	sp = 0xFD						# Stack pointer (8-bit)
-	pc = 0							# Program counter (16-bit)
-	pf = 0b00100000					# Processor flags NV-BDIZC (8-bit)
-	acc = 0							# Accumulator (8-bit)
-	x = 0							# X register (8-bit)
-	y = 0							# Y register (8-bit)
-	cycles = 0
-	
-	def __init__(self, mem):
-		self.mem = mem
-		self.flag = Flag()
-		self.pc = self.reset_vector()
-		self.ppu = graphics.PPU()
-		
-		self.mem._set_ppu(self.ppu)
+		# Direct threading: one closure per opcode, fetching its own operand
+		self._threaded = [self._thread(byte) for byte in range(0x100)]
 	
 	def _format_instr(self, byte):
 		instr = self.get_instruction_at(byte)
 		return f"Instruction {instr[0]} (0x{byte:02X}) at 0x{self.pc:04X}"
 		
 	def reset_vector(self):
-		return self.mem.read(0xFFFC) + (self.mem.read(0xFFFD) << 8)
+		return self.mem.read_word(0xFFFC)
 	
 	def irq_vector(self):
-		return self.mem.read(0xFFFE) + (self.mem.read(0xFFFF) << 8)
+		return self.mem.read_word(0xFFFE)
 	
 	def nmi_vector(self):
-		return self.mem.read(0xFFFA) + (self.mem.read(0xFFFB) << 8)
+		return self.mem.read_word(0xFFFA)
 	
 	def get_current_pc_byte(self):
 		return self.mem.read(self.pc)
@@ -202,20 +258,59 @@ class CPU:
 		
 	def get_instruction_at(self, loc):
 		cur_byte = self.get_current_pc_byte()
-		if cur_byte not in opcodes:
+		instr = opcodes_table[cur_byte]
+		if instr is None:
 			raise Exception(f"CPU::get_instruction_at: {self._format_instr(cur_byte)} is not a valid opcode")
 			print(f"CPU::get_instruction_at: {self._format_instr(cur_byte)} is not a valid opcode")
-			return opcodes[0xEA]
+			return opcodes_table[0xEA]
 		
-		return opcodes[cur_byte]
+		return instr
+	
+	def _nz(self, val):
+		# Set N and Z according to val (0x7D clears both)
+		self.p = (self.p & 0x7D) | (val & 0x80) | (0 if val else Z)
+	
+	def _adc_core(self, data):
+		"""Add data and the carry to the accumulator"""
+		flags = self.p
+		total = self.acc + data + (flags & C)
+		result = total & 0xFF
+		
+		# Rebuild N, V, Z and C from the sum, keeping the other flags
+		flags &= _NZCV_CLR
+		flags |= (total >> 8) | (result & N)
+		if result == 0:
+			flags |= Z
+		if (self.acc ^ result) & (data ^ result) & 0x80:
+			flags |= V
+		
+		self.p = flags
+		self.acc = result
+	
+	def _sbc_core(self, data):
+		"""Subtract data and the borrow from the accumulator"""
+		# acc - data - (1 - C) is acc + (data ^ 0xFF) + C, with the carry
+		# out of bit 7 being the inverted borrow
+		self._adc_core(data ^ 0xFF)
 	
 	def stack_push(self, val):
 		if self.sp < 0:
 			raise Exception("CPU::stack_push: Stack is full")
 		
-		self.mem.write(0x100 + self.sp, val % 0x100)
+		self.mem.write(0x100 + self.sp, val & 0xFF)
 		self.sp -= 1
 		
+	def stack_push16(self, val):
+		if self.sp < 1:
+			raise Exception("CPU::stack_push16: Stack is full")
+		
+		# The stack is always in internal RAM (0x0100 - 0x01FF), so bypass the
+		# memory mapping and write the high byte first, as two pushes would
+		stack = self.mem.mem
+		stack[0x100 + self.sp] = (val >> 8) & 0xFF
+		stack[0xFF + self.sp] = val & 0xFF
+		self.sp -= 2
+		
 	def stack_pop(self):
 		if self.sp == 0xFF:
 			raise Exception("CPU::stack_pop: Stack is empty")
@@ -224,600 +319,190 @@ class CPU:
 		return self.mem.read(0x100 + self.sp)
 	
 	def handle_irq(self):
-		self.stack_push(self.pc >> 8)
-		self.stack_push(self.pc & 0xFF)
-		self.stack_push(self.flag.get_byte())
+		self.stack_push16(self.pc)
+		self.stack_push(self.p)
 		
 		self.pc = self.irq_vector()
 		self.cycles += 7
 	
 	def handle_nmi(self):
 		print("------NMI-------")
-		self.stack_push(self.pc >> 8)
-		self.stack_push(self.pc & 0xFF)
-		self.stack_push(self.flag.get_byte())
+		self.stack_push16(self.pc)
+		self.stack_push(self.p)
 		
 		self.pc = self.nmi_vector()
 		self.cycles += 7
 		raise Exception("")
 		
-	def run(self):
-		# Track current cycle count for PPU
-		cur_cycles = self.cycles
-		
-		# Fetch the current instruction and data
-		instr = self.get_current_instruction()
-		instr_bytes = [self.mem.read(i) for i in range(self.pc + 1, self.pc + instr[1])]
-		data = int.from_bytes(instr_bytes, byteorder="little")
-		
-		# Print some information
-		line = "0x" + "".join([format(x, "02X") for x in instr_bytes[::-1]])
-		print(f"{self.pc:04X}: ({self.get_current_pc_byte():02X}) {instr[0]} {line if data != 0 else ''}");
-		
-		if instr[0] == "BRK":
-			raise Exception("die")
-		
-		# Run the instruction, if found and implemented
-		handler = getattr(self, "instruction_" + instr[0], self.instruction_not_implemented)
-		self.pc, self.cycles = handler(self.get_current_pc_byte(), instr, data)
-		
-		# Let the PPU catch up. 1 CPU cycle is approx. 3 PPU cycles
-		for _ in range(self.cycles - cur_cycles):
-			self.ppu.run(self)
+	def run(self, count = 1):
+		"""Run count instructions"""
+		threaded = self._threaded
+		read = self.mem.read
+		ppu_advance = self.ppu.advance
+		
+		for _ in range(count):
+			# Track current cycle count for PPU
+			cur_cycles = self.cycles
+			
+			# Run the instruction at pc, operand fetch included
+			threaded[read(self.pc)]()
+			
+			# Let the PPU catch up. 1 CPU cycle is approx. 3 PPU cycles
+			ppu_advance(self, (self.cycles - cur_cycles) * 3)
+	
+	def run_until(self, target_cycles):
+		"""Run instructions until the cycle count reaches target_cycles"""
+		threaded = self._threaded
+		read = self.mem.read
+		ppu_advance = self.ppu.advance
+		
+		while self.cycles < target_cycles:
+			cur_cycles = self.cycles
+			threaded[read(self.pc)]()
+			ppu_advance(self, (self.cycles - cur_cycles) * 3)
+	
+	def _thread(self, byte):
+		"""Build the closure running opcode byte, including the operand fetch"""
+		instr = opcodes_table[byte]
+		if instr is None:
+			# Reports the invalid opcode
+			return self.get_current_instruction
+		
+		cpu = self
+		rom_operands = self._rom_operands
+		handler = self._dispatch[byte]
+		length = lengths[byte]
+		
+		# Operands within PRG ROM come from the pre-decoded table, anything
+		# else (or running off the end of memory) is read through Memory
+		rom_start = 0x8000
+		rom_end = 0x10000 - length + 1
+		
+		if length == 1:
+			def execute():
+				if CPU.trace:
+					cpu._trace(byte, instr, 0)
+				
+				cpu.pc, cpu.cycles = handler(byte, instr, 0)
+		elif length == 2:
+			def execute():
+				pc = cpu.pc
+				if rom_start <= pc < rom_end:
+					data = rom_operands[pc] & 0xFF
+				else:
+					data = cpu._read_operand(pc, length)
+				
+				if CPU.trace:
+					cpu._trace(byte, instr, data)
+				
+				cpu.pc, cpu.cycles = handler(byte, instr, data)
+		else:
+			def execute():
+				pc = cpu.pc
+				if rom_start <= pc < rom_end:
+					data = rom_operands[pc]
+				else:
+					data = cpu._read_operand(pc, length)
+				
+				if CPU.trace:
+					cpu._trace(byte, instr, data)
+				
+				cpu.pc, cpu.cycles = handler(byte, instr, data)
 		
+		return execute
 	
-	def instruction_not_implemented(self, byte, instr, *args):
-		raise Exception(f"CPU::run: {self._format_instr(byte)} is not implemented")
-		
-	def instruction_ADC(self, byte, instr, addr):
-		pbc = False
-		
-		if byte == 0x69:
-			data = imm(addr)
-		elif byte == 0x65:
-			data = zp(addr, self.mem)
-		elif byte == 0x75:
-			data = zpx(addr, self.mem, self.x)
-		elif byte == 0x6D:
-			data = abs(addr, self.mem)
-		elif byte == 0x7D:
-			data, pbc = absxy(addr, self.mem, self.x)
-		elif byte == 0x79:
-			data, pbc = absxy(addr, self.mem, self.y)
-		elif byte == 0x61:
-			data = indx(addr, self.mem, self.x)
-		elif byte == 0x71:
-			data, pbc = indy(addr, self.mem, self.y)
-		
-		old_acc = self.acc
-		self.acc += data + self.flag.isset(Flag.C)
-		
-		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		self.flag.clear(Flag.C)
-		self.flag.clear(Flag.V)
-		
-		if ((old_acc^self.acc) & (data^self.acc)) & 0x80:
-			self.flag.set(Flag.V)
-		
-		if self.acc >= 256:
-			self.flag.set(Flag.C)
-		
-		if self.acc & 128:
-			self.flag.set(Flag.N)
-			
-		self.acc %= 0x100
-		
-		if self.acc == 0:
-			self.flag.set(Flag.Z)
-
-		return self.pc + instr[1], self.cycles + instr[2] + instr[3] * pbc
-		
-	def instruction_AND(self, byte, instr, addr):
-		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		
-		# Add x register
-		if byte == 0x35 or byte == 0x3D or byte == 0x21:
-			addr += self.x
-			# Wrap zero page
-			if byte == 0x35:
-				addr %= 0x100
-		
-		# Add y register
-		if byte == 0x39:
-			addr += self.y
-		
-		# Indexed indirect x
-		# https://www.c64-wiki.com/wiki/Indexed-indirect_addressing
-		if byte == 0x21:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
+	def _read_operand(self, pc, length):
+		if length == 2:
+			return self.mem.read(pc + 1)
 		
-		# Indirect indexed y
-		# https://www.c64-wiki.com/wiki/Indirect-indexed_addressing
-		if byte == 0x31:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
-			addr += self.y
-		
-		# Load immediate
-		if byte != 0x29:
-			data = self.mem.read(addr % 0x10000)
-		else:
-			data = addr
-			
-		# Exec AND
-		self.acc &= data
-					
-		if self.acc == 0:
-			self.flag.set(Flag.Z)
-		
-		if self.acc >= 128:
-			self.flag.set(Flag.N)
-				
-		return self.pc + instr[1], self.cycles + instr[2] + instr[3] * (self.mem.page_num(self.pc) != self.mem.page_num(addr))
+		return self.mem.read(pc + 1) | (self.mem.read(pc + 2) << 8)
 	
-	def instruction_ASL(self, byte, instr, addr):
-		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		self.flag.clear(Flag.C)
-		
-		# Add x register
-		if byte == 0x16 or byte == 0x1E:
-			addr += self.x
-			# Wrap zero page
-			if byte == 0x16:
-				addr %= 0x100
-			
-		# Shift Accumulator
-		if byte == 0x0A:
-			if self.acc & 0x80:
-				self.flag.set(Flag.C)
-			
-			self.acc <<= 1
-			self.acc %= 0x100
-			
-			if self.acc & 0x80:
-				self.flag.set(Flag.N)
-				
-			if self.acc == 0:
-				self.flag.set(Flag.Z)
-		else:
-			# Shift memory
-			data = self.mem.read(addr)
-			if data & 0x80:
-				self.flag.set(Flag.C)
-			
-			self.mem.write(addr, (data << 1) % 0x100)
-			
-			if self.mem.read(addr) & 0x80:
-				self.flag.set(Flag.N)
-				
-			if self.mem.read(addr) == 0:
-				self.flag.set(Flag.Z)
-				
-		return self.pc + instr[1], self.cycles + instr[2]
+	def _trace(self, byte, instr, data):
+		line = f"0x{data:0{(instr[1] - 1) * 2}X}"
+		print(f"{self.pc:04X}: ({byte:02X}) {instr[0]} {line if data != 0 else ''}");
 		
-	def instruction_BCC(self, byte, instr, addr):
-		add_cycles = instr[2]
-		new_pc = self.pc + instr[1]
-		if not self.flag.isset(Flag.C):
-			# See: http://forum.6502.org/viewtopic.php?f=2&t=5373
-			# The pc increments afer each byte being read, which means that to
-			# calculate the right offset, we assume the pc to be after this instruction
-			new_pc += signed_byte_to_int(addr, 8)
-			add_cycles += 1
-			if self.mem.page_num(self.pc) != self.mem.page_num(new_pc):
-				add_cycles += instr[3]
-				
-		return new_pc, self.cycles + add_cycles	
+	def instruction_not_implemented(self, byte, instr, *args):
+		raise Exception(f"CPU::run: {self._format_instr(byte)} is not implemented")
 	
-	def instruction_BCS(self, byte, instr, addr):
-		add_cycles = instr[2]
-		new_pc = self.pc + instr[1]
-		if self.flag.isset(Flag.C):
-			# See: http://forum.6502.org/viewtopic.php?f=2&t=5373
-			# The pc increments afer each byte being read, which means that to
-			# calculate the right offset, we assume the pc to be after this instruction
-			new_pc += signed_byte_to_int(addr, 8)
-			add_cycles += 1
-			if self.mem.page_num(self.pc) != self.mem.page_num(new_pc):
-				add_cycles += instr[3]
-				
-		return new_pc, self.cycles + add_cycles	
+	def _halt(self, byte, instr, *args):
+		raise Exception("die")
 	
-	def instruction_BEQ(self, byte, instr, addr):
-		add_cycles = instr[2]
-		new_pc = self.pc + instr[1]
-		if self.flag.isset(Flag.Z):
-			# See: http://forum.6502.org/viewtopic.php?f=2&t=5373
-			# The pc increments afer each byte being read, which means that to
-			# calculate the right offset, we assume the pc to be after this instruction
-			new_pc += signed_byte_to_int(addr, 8)
-			add_cycles += 1
-			if self.mem.page_num(self.pc) != self.mem.page_num(new_pc):
-				add_cycles += instr[3]
-				
-		return new_pc, self.cycles + add_cycles	
+	def _jam_trap(self, byte, instr, *args):
+		raise Exception(f"CPU::run: {self._format_instr(byte)} jammed the processor")
 	
-	def instruction_BIT(self, byte, instr, addr):
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.V)
-		self.flag.clear(Flag.Z)
-		
-		data = self.mem.read(addr)
-		
-		if self.acc & data == 0:
-			self.flag.set(Flag.Z)
-		
-		if data & 128:
-			self.flag.set(Flag.N)
-			
-		if data & 64:
-			self.flag.set(Flag.V)
-			
-		return self.pc + instr[1], self.cycles + instr[2]
-		
-	def instruction_BMI(self, byte, instr, addr):
+	def _branch(self, flag, expected, byte, instr, addr):
+		# Shared by all branch instructions, see _BRANCH_TABLE
 		add_cycles = instr[2]
 		new_pc = self.pc + instr[1]
-		if self.flag.isset(Flag.N):
+		if (self.p & flag) == expected:
 			# See: http://forum.6502.org/viewtopic.php?f=2&t=5373
 			# The pc increments afer each byte being read, which means that to
 			# calculate the right offset, we assume the pc to be after this instruction
-			new_pc += signed_byte_to_int(addr, 8)
+			new_pc += _SIGNED[addr]
 			add_cycles += 1
-			if self.mem.page_num(self.pc) != self.mem.page_num(new_pc):
+			if (self.pc ^ new_pc) & 0xFF00:
 				add_cycles += instr[3]
 				
-		return new_pc, self.cycles + add_cycles	
-		
-	def instruction_BNE(self, byte, instr, addr):
-		add_cycles = instr[2]
-		new_pc = self.pc + instr[1]
-		if not self.flag.isset(Flag.Z):
-			# See: http://forum.6502.org/viewtopic.php?f=2&t=5373
-			# The pc increments afer each byte being read, which means that to
-			# calculate the right offset, we assume the pc to be after this instruction
-			new_pc += signed_byte_to_int(addr, 8)
-			add_cycles += 1
-			if self.mem.page_num(self.pc) != self.mem.page_num(new_pc):
-				add_cycles += instr[3]
-				
-		return new_pc, self.cycles + add_cycles	
-		
-	def instruction_BPL(self, byte, instr, addr):
-		add_cycles = instr[2]
-		new_pc = self.pc + instr[1]
-		if not self.flag.isset(Flag.N):
-			# See: http://forum.6502.org/viewtopic.php?f=2&t=5373
-			# The pc increments afer each byte being read, which means that to
-			# calculate the right offset, we assume the pc to be after this instruction
-			new_pc += signed_byte_to_int(addr, 8)
-			add_cycles += 1
-			if self.mem.page_num(self.pc) != self.mem.page_num(new_pc):
-				add_cycles += instr[3]
-				
-		return new_pc, self.cycles + add_cycles			
+		return new_pc, self.cycles + add_cycles
 		
 	def instruction_BRK(self, byte, instr, *args):		
 		tostack = self.pc + instr[1] + 2
-		self.stack_push(tostack >> 8)
-		self.stack_push(tostack & 0xFF)
-		self.stack_push(self.flag.get_byte() | Flag.B)
+		self.stack_push16(tostack)
+		self.stack_push(self.p | B)
 		
-		self.flag.set(Flag.B)
+		self.p |= B
 		
 		return self.nmi_vector(), self.cycles + instr[2]
 	
-	def instruction_BVC(self, byte, instr, addr):
-		add_cycles = instr[2]
-		new_pc = self.pc + instr[1]
-		if not self.flag.isset(Flag.V):
-			# See: http://forum.6502.org/viewtopic.php?f=2&t=5373
-			# The pc increments afer each byte being read, which means that to
-			# calculate the right offset, we assume the pc to be after this instruction
-			new_pc += signed_byte_to_int(addr, 8)
-			add_cycles += 1
-			if self.mem.page_num(self.pc) != self.mem.page_num(new_pc):
-				add_cycles += instr[3]
-				
-		return new_pc, self.cycles + add_cycles	
-	
-	def instruction_BVS(self, byte, instr, addr):
-		add_cycles = instr[2]
-		new_pc = self.pc + instr[1]
-		if self.flag.isset(Flag.V):
-			# See: http://forum.6502.org/viewtopic.php?f=2&t=5373
-			# The pc increments afer each byte being read, which means that to
-			# calculate the right offset, we assume the pc to be after this instruction
-			new_pc += signed_byte_to_int(addr, 8)
-			add_cycles += 1
-			if self.mem.page_num(self.pc) != self.mem.page_num(new_pc):
-				add_cycles += instr[3]
-				
-		return new_pc, self.cycles + add_cycles	
-	
 	def instruction_CLC(self, byte, instr, *args):
-		self.flag.clear(Flag.C)
+		self.p &= ~C
 		
 		return self.pc + instr[1], self.cycles + instr[2]
 		
 	def instruction_CLD(self, byte, instr, *args):
-		self.flag.clear(Flag.D)
+		self.p &= ~D
 		
 		return self.pc + instr[1], self.cycles + instr[2]
 		
 	def instruction_CLI(self, byte, instr, *args):
-		self.flag.clear(Flag.I)
+		self.p &= ~I
 		
 		return self.pc + instr[1], self.cycles + instr[2]
 		
 	def instruction_CLV(self, byte, instr, *args):
-		self.flag.clear(Flag.V)
-		
-		return self.pc + instr[1], self.cycles + instr[2]
-		
-	def instruction_CMP(self, byte, instr, addr):
-		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		self.flag.clear(Flag.C)
-		
-		# Add x register
-		if byte == 0xD5 or byte == 0xDD or byte == 0xC1:
-			addr += self.x
-			# Wrap zero page
-			if byte == 0xD5:
-				addr %= 0x100
-		
-		# Add y register
-		if byte == 0xD9:
-			addr += self.y
-		
-		# Indexed indirect x
-		# https://www.c64-wiki.com/wiki/Indexed-indirect_addressing
-		if byte == 0xC1:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
-		
-		# Indirect indexed y
-		# https://www.c64-wiki.com/wiki/Indirect-indexed_addressing
-		if byte == 0xD1:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
-			addr += self.y
-		
-		# Load immediate
-		if byte != 0xC9:
-			data = self.mem.read(addr % 0x10000)
-		else:
-			data = addr
-			
-		if self.acc >= data:
-			self.flag.set(Flag.C)
-		
-		if self.acc == data:
-			self.flag.set(Flag.Z)
-		
-		if ((self.acc - data) % 0x100) & 128:
-			self.flag.set(Flag.N)
-				
-		return self.pc + instr[1], self.cycles + instr[2] + instr[3] * (self.mem.page_num(self.pc) != self.mem.page_num(addr))
-		
-	def instruction_CPX(self, byte, instr, addr):
-		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		self.flag.clear(Flag.C)
-		
-		# Load immediate
-		if byte != 0xE0:
-			data = self.mem.read(addr % 0x10000)
-		else:
-			data = addr
-			
-		if self.x >= data:
-			self.flag.set(Flag.C)
-		
-		if self.x == data:
-			self.flag.set(Flag.Z)
-		
-		if (self.x - data) & 128:
-			self.flag.set(Flag.N)
-				
-		return self.pc + instr[1], self.cycles + instr[2]
-		
-	def instruction_CPY(self, byte, instr, addr):
-		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		self.flag.clear(Flag.C)
-		
-		# Load immediate
-		if byte != 0xC0:
-			data = self.mem.read(addr % 0x10000)
-		else:
-			data = addr
-			
-		if self.y >= data:
-			self.flag.set(Flag.C)
-
-		if self.y == data:
-			self.flag.set(Flag.Z)
-		
-		if (self.y - data) & 128:
-			self.flag.set(Flag.N)
-				
-		return self.pc + instr[1], self.cycles + instr[2]
-		
-	def instruction_DEC(self, byte, instr, addr):
-		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		
-		# Add x register
-		if byte == 0xD6 or byte == 0xDE:
-			addr += self.x
-			# Wrap zero page
-			if byte == 0xD6:
-				addr %= 0x100
-				
-		# Decrement memory
-		self.mem.write(addr, (self.mem.read(addr) - 1) % 0x100)
-		
-		# Set flags
-		if self.mem.read(addr) == 0:
-			self.flag.set(Flag.Z)
-			
-		if self.mem.read(addr) & 0x80:
-			self.flag.set(Flag.N)
+		self.p &= ~V
 		
 		return self.pc + instr[1], self.cycles + instr[2]
 		
 	def instruction_DEX(self, byte, instr, *args):
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		
 		self.x -= 1
-		self.x %= 0x100
-		
-		if self.x == 0:
-			self.flag.set(Flag.Z)
+		self.x &= 0xFF
 		
-		if self.x & 0x80:
-			self.flag.set(Flag.N)
+		self._nz(self.x)
 		
 		return self.pc + instr[1], self.cycles + instr[2]
 		
 	def instruction_DEY(self, byte, instr, *args):
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		
 		self.y -= 1
-		self.y %= 0x100
-		
-		if self.y == 0:
-			self.flag.set(Flag.Z)
-		
-		if self.y & 0x80:
-			self.flag.set(Flag.N)
-		
-		return self.pc + instr[1], self.cycles + instr[2]
-		
-	def instruction_EOR(self, byte, instr, addr):
-		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		
-		# Add x register
-		if byte == 0x55 or byte == 0x5D or byte == 0x41:
-			addr += self.x
-			# Wrap zero page
-			if byte == 0x55:
-				addr %= 0x100
-		
-		# Add y register
-		if byte == 0x59:
-			addr += self.y
-			
-		# Indexed indirect x
-		# https://www.c64-wiki.com/wiki/Indexed-indirect_addressing
-		if byte == 0x41:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
-		
-		# Indirect indexed y
-		# https://www.c64-wiki.com/wiki/Indirect-indexed_addressing
-		if byte == 0x51:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
-			addr += self.y
-		
-		# Load immediate
-		if byte != 0x49:
-			data = self.mem.read(addr % 0x10000)
-		else:
-			data = addr
-			
-		# Exec XOR
-		self.acc ^= data
-					
-		if self.acc == 0:
-			self.flag.set(Flag.Z)
-		
-		if self.acc >= 128:
-			self.flag.set(Flag.N)
-				
-		return self.pc + instr[1], self.cycles + instr[2] + instr[3] * (self.mem.page_num(self.pc) != self.mem.page_num(addr))
-		
-	def instruction_INC(self, byte, instr, addr):
-		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		
-		# Add x register
-		if byte == 0xF6 or byte == 0xFE:
-			addr += self.x
-			# Wrap zero page
-			if byte == 0xF6:
-				addr %= 0x100
-				
-		# Increment memory
-		self.mem.write(addr, (self.mem.read(addr) + 1) % 0x100)
+		self.y &= 0xFF
 		
-		# Set flags
-		if self.mem.read(addr) == 0:
-			self.flag.set(Flag.Z)
-			
-		if self.mem.read(addr) & 0x80:
-			self.flag.set(Flag.N)
+		self._nz(self.y)
 		
 		return self.pc + instr[1], self.cycles + instr[2]
 		
 	def instruction_INX(self, byte, instr, *args):
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		
 		self.x += 1
-		self.x %= 0x100
+		self.x &= 0xFF
 		
-		if self.x == 0:
-			self.flag.set(Flag.Z)
-		
-		if self.x & 0x80:
-			self.flag.set(Flag.N)
+		self._nz(self.x)
 		
 		return self.pc + instr[1], self.cycles + instr[2]
 		
 	def instruction_INY(self, byte, instr, *args):
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		
 		self.y += 1
-		self.y %= 0x100
-		
-		if self.y == 0:
-			self.flag.set(Flag.Z)
+		self.y &= 0xFF
 		
-		if self.y & 0x80:
-			self.flag.set(Flag.N)
+		self._nz(self.y)
 		
 		return self.pc + instr[1], self.cycles + instr[2]
 		
@@ -840,206 +525,13 @@ class CPU:
 	def instruction_JSR(self, byte, instr, addr):
 		# Info: https://stackoverflow.com/questions/21465200/6502-assembler-the-rts-command-and-the-stack
 		tostack = self.pc + instr[1] - 1
-		self.stack_push(tostack >> 8)
-		self.stack_push(tostack & 0xFF)
+		self.stack_push16(tostack)
 		
 		return addr, self.cycles + instr[2]
 		
-	def instruction_LDA(self, byte, instr, addr):
-		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		
-		# Add x register
-		if byte == 0xB5 or byte == 0xBD or byte == 0xA1:
-			addr += self.x
-			# Wrap zero page
-			if byte == 0xB5:
-				addr %= 0x100
-		
-		# Add y register
-		if byte == 0xB9:
-			addr += self.y
-			
-		# Indexed indirect x
-		# https://www.c64-wiki.com/wiki/Indexed-indirect_addressing
-		if byte == 0xA1:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
-		
-		# Indirect indexed y
-		# https://www.c64-wiki.com/wiki/Indirect-indexed_addressing
-		if byte == 0xB1:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
-			addr += self.y
-		
-		# Load immediate
-		if byte != 0xA9:
-			data = self.mem.read(addr % 0x10000)
-		else:
-			data = addr
-			
-		self.acc = data
-		
-		if self.acc == 0:
-			self.flag.set(Flag.Z)
-		
-		if self.acc >= 128:
-			self.flag.set(Flag.N)
-				
-		return self.pc + instr[1], self.cycles + instr[2] + instr[3] * (self.mem.page_num(self.pc) != self.mem.page_num(addr))
-		
-	def instruction_LDX(self, byte, instr, addr):
-		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		
-		# Add y register
-		if byte == 0xB6 or byte == 0xBE:
-			addr += self.y
-			# Wrap Zero Page
-			if byte == 0xB6:
-				addr %= 0x100
-		
-		# Load data from address
-		if byte != 0xA2:
-			data = self.mem.read(addr)
-		else:
-			# Load immediate
-			data = addr
-		
-		self.x = data
-		
-		#Set flags
-		if self.x == 0:
-			self.flag.set(Flag.Z)
-			
-		if self.x >= 0x80:
-			self.flag.set(Flag.N)
-			
-		return self.pc + instr[1], self.cycles + instr[2] + instr[3] * (self.mem.page_num(self.pc) != self.mem.page_num(addr))
-		
-	def instruction_LDY(self, byte, instr, addr):
-		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		
-		# Add x register
-		if byte == 0xB4 or byte == 0xBC:
-			addr += self.x
-			# Wrap Zero Page
-			if byte == 0xB4:
-				addr %= 0x100
-		
-		# Load data from address
-		if byte != 0xA0:
-			data = self.mem.read(addr)
-		else:
-			# Load immediate
-			data = addr
-		
-		self.y = data
-		
-		#Set flags
-		if self.y == 0:
-			self.flag.set(Flag.Z)
-			
-		if self.y >= 0x80:
-			self.flag.set(Flag.N)
-			
-		return self.pc + instr[1], self.cycles + instr[2] + instr[3] * (self.mem.page_num(self.pc) != self.mem.page_num(addr))
-		
-	def instruction_LSR(self, byte, instr, addr):
-		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		self.flag.clear(Flag.C)
-		
-		# Add x register
-		if byte == 0x56 or byte == 0x5E:
-			addr += self.x
-			# Wrap zero page
-			if byte == 0x56:
-				addr %= 0x100
-				
-		# Shift value at addr or at acc
-		if byte == 0x4A:
-			old_data = self.acc
-			self.acc >>= 1
-			new_data = self.acc
-		else:
-			old_data = self.mem.read(addr)
-			self.mem.write(addr, old_data >> 1)
-			new_data = self.mem.read(addr)
-
-		if old_data & 0x01:
-			self.flag.set(Flag.C)
-			
-		if new_data == 0:
-			self.flag.set(Flag.Z)
-		
-		if new_data & 0x80:		# Theoretically, this should never happen
-			self.flag.set(Flag.N)
-				
-		return self.pc + instr[1], self.cycles + instr[2] + instr[3] * (self.mem.page_num(self.pc) != self.mem.page_num(addr))
-		
 	def instruction_NOP(self, byte, instr, *args):
 		return self.pc + instr[1], self.cycles + instr[2]
 		
-	def instruction_ORA(self, byte, instr, addr):
-		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		
-		# Add x register
-		if byte == 0x15 or byte == 0x1D or byte == 0x01:
-			addr += self.x
-			# Wrap zero page
-			if byte == 0x15:
-				addr %= 0x100
-		
-		# Add y register
-		if byte == 0x19:
-			addr += self.y
-			
-		# Indexed indirect x
-		# https://www.c64-wiki.com/wiki/Indexed-indirect_addressing
-		if byte == 0x01:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
-		
-		# Indirect indexed y
-		# https://www.c64-wiki.com/wiki/Indirect-indexed_addressing
-		if byte == 0x11:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
-			addr += self.y
-		
-		# Load immediate
-		if byte != 0x09:
-			data = self.mem.read(addr % 0x10000)
-		else:
-			data = addr
-			
-		self.acc |= data
-		
-		if self.acc == 0:
-			self.flag.set(Flag.Z)
-		
-		if self.acc >= 128:
-			self.flag.set(Flag.N)
-				
-		return self.pc + instr[1], self.cycles + instr[2] + instr[3] * (self.mem.page_num(self.pc) != self.mem.page_num(addr))
-		
 	def instruction_PHA(self, byte, instr, *args):
 		self.stack_push(self.acc)
 		
@@ -1047,104 +539,29 @@ class CPU:
 		
 	def instruction_PHP(self, byte, instr, *args):
 		# See: https://wiki.nesdev.com/w/index.php/Status_flags#The_B_flag
-		self.stack_push(self.flag.get_byte() | Flag.B)
+		self.stack_push(self.p | B)
 		
 		return self.pc + instr[1], self.cycles + instr[2]
 		
 	def instruction_PLA(self, byte, instr, *args):
-		self.flag.clear(Flag.Z)
-		self.flag.clear(Flag.N)
-		
 		self.acc = self.stack_pop()
 		
-		if self.acc == 0:
-			self.flag.set(Flag.Z)
-		
-		if self.acc & 0x80:
-			self.flag.set(Flag.N)
+		self._nz(self.acc)
 		
 		return self.pc + instr[1], self.cycles + instr[2]
 		
 	def instruction_PLP(self, byte, instr, *args):
 		# Ignore B Flag: https://wiki.nesdev.com/w/index.php/Status_flags#The_B_flag
-		self.flag.set_byte(self.stack_pop() & ~Flag.B)
+		self.p = (self.stack_pop() & ~B) | U
 		
 		return self.pc + instr[1], self.cycles + instr[2]
 		
-	def instruction_ROL(self, byte, instr, addr):
-		# Add x register
-		if byte == 0x36 or byte == 0x3E:
-			addr += self.x
-			# Wrap zero page
-			if byte == 0x36:
-				addr %= 0x100
-				
-		# Shift value at addr or at acc
-		if byte == 0x2A:
-			old_data = self.acc
-			self.acc = ((self.acc << 1) + self.flag.isset(Flag.C)) % 0x100
-			new_data = self.acc
-		else:
-			old_data = self.mem.read(addr)
-			self.mem.write(addr, ((old_data << 1) + self.flag.isset(Flag.C)) % 0x100)
-			new_data = self.mem.read(addr)
-			
-		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		self.flag.clear(Flag.C)
-
-		if old_data & 0x80:
-			self.flag.set(Flag.C)
-			
-		if new_data == 0:
-			self.flag.set(Flag.Z)
-		
-		if new_data & 0x80:
-			self.flag.set(Flag.N)
-				
-		return self.pc + instr[1], self.cycles + instr[2] + instr[3] * (self.mem.page_num(self.pc) != self.mem.page_num(addr))
-		
-	def instruction_ROR(self, byte, instr, addr):		
-		# Add x register
-		if byte == 0x76 or byte == 0x7E:
-			addr += self.x
-			# Wrap zero page
-			if byte == 0x76:
-				addr %= 0x100
-				
-		# Shift value at addr or at acc
-		if byte == 0x6A:
-			old_data = self.acc
-			self.acc = (self.acc >> 1) + (self.flag.isset(Flag.C) << 7)
-			new_data = self.acc
-		else:
-			old_data = self.mem.read(addr)
-			self.mem.write(addr, (old_data >> 1) + (self.flag.isset(Flag.C) << 7))
-			new_data = self.mem.read(addr)
-			
-		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		self.flag.clear(Flag.C)
-
-		if old_data & 0x01:
-			self.flag.set(Flag.C)
-			
-		if new_data == 0:
-			self.flag.set(Flag.Z)
-		
-		if new_data & 0x80:
-			self.flag.set(Flag.N)
-				
-		return self.pc + instr[1], self.cycles + instr[2] + instr[3] * (self.mem.page_num(self.pc) != self.mem.page_num(addr))
-		
 	def instruction_RTI(self, byte, instr, *args):
 		# See: https://wiki.nesdev.com/w/index.php/Status_flags#The_B_flag
-		flags = self.stack_pop() & ~Flag.B
+		flags = self.stack_pop() & ~B
 		new_pc = self.stack_pop() + (self.stack_pop() << 8)
 		
-		self.flag.set_byte(flags)
+		self.p = flags | U
 		
 		return new_pc, self.cycles + instr[2]
 		
@@ -1155,191 +572,46 @@ class CPU:
 		
 		return new_pc + instr[1], self.cycles + instr[2]
 		
-	def instruction_SBC(self, byte, instr, addr):
-		# Add x register
-		if byte == 0xF5 or byte == 0xFD or byte == 0xE1:
-			addr += self.x
-			# Wrap zero page
-			if byte == 0xF5:
-				addr %= 0x100
-		
-		# Add y register
-		if byte == 0xF9:
-			addr += self.y
-		
-		# Indexed indirect x
-		# https://www.c64-wiki.com/wiki/Indexed-indirect_addressing
-		if byte == 0xE1:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
-		
-		# Indirect indexed y
-		# https://www.c64-wiki.com/wiki/Indirect-indexed_addressing
-		if byte == 0xF1:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
-			addr += self.y
-		
-		# Load immediate
-		if byte != 0xE9:
-			data = self.mem.read(addr % 0x10000)
-		else:
-			data = addr
-
-		old_acc = self.acc
-		self.acc += ~data + self.flag.isset(Flag.C)
-		
-		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		self.flag.set(Flag.C) # This should be set before SBC is called, but doesn't seem to be
-		self.flag.clear(Flag.V)
-		
-		if self.acc < 0:
-			self.flag.clear(Flag.C)
-		
-		if self.acc & 128:
-			self.flag.set(Flag.N)
-			
-		self.acc %= 0x100
-		
-		if self.acc == 0:
-			self.flag.set(Flag.Z)
-			
-		if ((old_acc^self.acc) & ~(data^self.acc)) & 0x80:
-			self.flag.set(Flag.V)
-
-		return self.pc + instr[1], self.cycles + instr[2] + instr[3] * (self.mem.page_num(self.pc) != self.mem.page_num(addr))
-		
 	def instruction_SEC(self, byte, instr, *args):
-		self.flag.set(Flag.C)
+		self.p |= C
 		
 		return self.pc + instr[1], self.cycles + instr[2]
 		
 	def instruction_SED(self, byte, instr, *args):
-		self.flag.set(Flag.D)
+		self.p |= D
 		
 		return self.pc + instr[1], self.cycles + instr[2]
 		
 	def instruction_SEI(self, byte, instr, *args):
-		self.flag.set(Flag.I)
-		
-		return self.pc + instr[1], self.cycles + instr[2]
-		
-	def instruction_STA(self, byte, instr, addr):
-		# Add x register
-		if byte == 0x95 or byte == 0x9D or byte == 0x81:
-			addr = (addr + self.x)
-		
-		# Wrap Zero Page
-		if byte == 0x95:
-			addr %= 0x100
-		
-		# Add y register
-		if byte == 0x99:
-			addr = (addr + self.y)
-			
-		# Indexed indirect x
-		# https://www.c64-wiki.com/wiki/Indexed-indirect_addressing
-		if byte == 0x81:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
-		
-		# Indirect indexed y
-		# https://www.c64-wiki.com/wiki/Indirect-indexed_addressing
-		if byte == 0x91:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
-			addr += self.y
-		
-		addr %= 0x10000
-		self.mem.write(addr, self.acc)
-		
-		return self.pc + instr[1], self.cycles + instr[2]
-		
-	def instruction_STX(self, byte, instr, addr):
-		# Add y register
-		if byte == 0x96:
-			addr += self.y
-			addr %= 0x100
-		
-		addr %= 0x10000
-		self.mem.write(addr, self.x)
-		
-		return self.pc + instr[1], self.cycles + instr[2]
-		
-	def instruction_STY(self, byte, instr, addr):
-		# Add x register
-		if byte == 0x94:
-			addr += self.x
-			addr %= 0x100
-		
-		addr %= 0x10000
-		self.mem.write(addr, self.y)
+		self.p |= I
 		
 		return self.pc + instr[1], self.cycles + instr[2]
 		
 	def instruction_TAX(self, byte, instr, *args):
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		
 		self.x = self.acc
 		
-		if self.x == 0:
-			self.flag.set(Flag.Z)
-		
-		if self.x >= 0x80:
-			self.flag.set(Flag.N)
+		self._nz(self.x)
 		
 		return self.pc + instr[1], self.cycles + instr[2]
 		
 	def instruction_TAY(self, byte, instr, *args):
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		
 		self.y = self.acc
 		
-		if self.y == 0:
-			self.flag.set(Flag.Z)
-		
-		if self.y >= 0x80:
-			self.flag.set(Flag.N)
+		self._nz(self.y)
 		
 		return self.pc + instr[1], self.cycles + instr[2]
 		
 	def instruction_TSX(self, byte, instr, *args):
-		self.flag.clear(Flag.Z)
-		self.flag.clear(Flag.N)
-		
 		self.x = self.sp
 		
-		if self.x == 0:
-			self.flag.set(Flag.Z)
-			
-		if self.x & 0x80:
-			self.flag.set(Flag.N)
+		self._nz(self.x)
 		
 		return self.pc + instr[1], self.cycles + instr[2]
 		
 	def instruction_TXA(self, byte, instr, *args):
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		
 		self.acc = self.x
 		
-		if self.acc == 0:
-			self.flag.set(Flag.Z)
-		
-		if self.acc >= 0x80:
-			self.flag.set(Flag.N)
+		self._nz(self.acc)
 		
 		return self.pc + instr[1], self.cycles + instr[2]
 		
@@ -1349,16 +621,9 @@ class CPU:
 		return self.pc + instr[1], self.cycles + instr[2]
 		
 	def instruction_TYA(self, byte, instr, *args):
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		
 		self.acc = self.y
 		
-		if self.y == 0:
-			self.flag.set(Flag.Z)
-		
-		if self.y >= 0x80:
-			self.flag.set(Flag.N)
+		self._nz(self.y)
 		
 		return self.pc + instr[1], self.cycles + instr[2]
 	
@@ -1367,301 +632,96 @@ class CPU:
 	def instruction_iDCP(self, byte, instr, addr):
 		# Combine DEC and CMP
 		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		self.flag.clear(Flag.C)
-		
-		# Add x register
-		if byte == 0xD7 or byte == 0xDF or byte == 0xC3:
-			addr += self.x
-			# Wrap zero page
-			if byte == 0xD7:
-				addr %= 0x100
-				
-		# Add y register
-		if byte == 0xD8 or byte == 0xDB:
-			addr += self.y
-		
-		# Indexed indirect x
-		# https://www.c64-wiki.com/wiki/Indexed-indirect_addressing
-		if byte == 0xC3:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
+		self.p &= _NZC_CLR
 		
-		# Indirect indexed y
-		# https://www.c64-wiki.com/wiki/Indirect-indexed_addressing
-		if byte == 0xD3:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
-			addr += self.y
+		addr = _ADDR_MODE[byte](self, addr)
 		
-				
 		# Decrement memory
-		data = (self.mem.read(addr) - 1) % 0x100
+		data = (self.mem.read(addr) - 1) & 0xFF
 		self.mem.write(addr, data)
 			
 		if self.acc >= data:
-			self.flag.set(Flag.C)
+			self.p |= C
 		
 		if self.acc == data:
-			self.flag.set(Flag.Z)
+			self.p |= Z
 		
-		if ((self.acc - data) % 0x100) & 0x80:
-			self.flag.set(Flag.N)
+		if ((self.acc - data) & 0xFF) & 0x80:
+			self.p |= N
 		
 		return self.pc + instr[1], self.cycles + instr[2]
 	
 	def instruction_iISC(self, byte, instr, addr):
 		# Combine INC and SBC
-		# Add x register
-		if byte == 0xF7 or byte == 0xFF or byte == 0xE3:
-			addr += self.x
-			# Wrap zero page
-			if byte == 0xF7:
-				addr %= 0x100
-				
-		# Add y register
-		if byte == 0xFB:
-			addr += self.y
-			
-		# Indexed indirect x
-		# https://www.c64-wiki.com/wiki/Indexed-indirect_addressing
-		if byte == 0xE3:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
+		addr = _ADDR_MODE[byte](self, addr)
 		
-		# Indirect indexed y
-		# https://www.c64-wiki.com/wiki/Indirect-indexed_addressing
-		if byte == 0xF3:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
-			addr += self.y
-				
 		# Increment memory
-		data = (self.mem.read(addr) + 1) % 0x100
+		data = (self.mem.read(addr) + 1) & 0xFF
 		self.mem.write(addr, data)
 		
-		# SBC
-		old_acc = self.acc
-		self.acc += ~data + self.flag.isset(Flag.C)
-		
-		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		self.flag.set(Flag.C) # This should be set before SBC is called, but doesn't seem to be
-		self.flag.clear(Flag.V)
-		
-		if self.acc < 0:
-			self.flag.clear(Flag.C)
-		
-		if self.acc & 128:
-			self.flag.set(Flag.N)
-			
-		self.acc %= 0x100
-		
-		if self.acc == 0:
-			self.flag.set(Flag.Z)
-			
-		if ((old_acc^self.acc) & ~(data^self.acc)) & 0x80:
-			self.flag.set(Flag.V)
+		self._sbc_core(data)
 			
 		return self.pc + instr[1], self.cycles + instr[2]
 	
 	def instruction_iLAX(self, byte, instr, addr):
 		# Combine LDA and LDX
-		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		
-		# Add y register
-		if byte == 0xB7 or byte == 0xBF:
-			addr += self.y
-			# Check zero page
-			if byte == 0xB7:
-				addr %= 0x100
-			
-		# Indexed indirect x
-		# https://www.c64-wiki.com/wiki/Indexed-indirect_addressing
-		if byte == 0xA3:
-			addr += self.x
-			
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
+		addr = _ADDR_MODE[byte](self, addr)
 		
-		# Indirect indexed y
-		# https://www.c64-wiki.com/wiki/Indirect-indexed_addressing
-		if byte == 0xB3:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
-			addr += self.y
-		
-		data = self.mem.read(addr % 0x10000)
+		data = self.mem.read(addr)
 			
 		self.x = data
 		self.acc = data
 		
-		if data == 0:
-			self.flag.set(Flag.Z)
+		self._nz(data)
 		
-		if data >= 0x80:
-			self.flag.set(Flag.N)
-		
-		return self.pc + instr[1], self.cycles + instr[2] + instr[3] * (self.mem.page_num(self.pc) != self.mem.page_num(addr))
+		return self.pc + instr[1], self.cycles + instr[2] + instr[3] * ((self.pc ^ addr) & 0xFF00 != 0)
 	
 	def instruction_iNOP(self, byte, instr, addr):
-		return self.pc + instr[1], self.cycles + instr[2] + instr[3] * (self.mem.page_num(self.pc) != self.mem.page_num(addr))
+		return self.pc + instr[1], self.cycles + instr[2] + instr[3] * ((self.pc ^ addr) & 0xFF00 != 0)
 	
 	def instruction_iRLA(self, byte, instr, addr):
 		# Combine ROL and AND
-		# Add x register
-		if byte == 0x37 or byte == 0x3F or byte == 0x23:
-			addr += self.x
-			# Wrap zero page
-			if byte == 0x37:
-				addr %= 0x100
-				
-		# Add y register
-		if byte == 0x3B:
-			addr += self.y
-		
-		# Indexed indirect x
-		# https://www.c64-wiki.com/wiki/Indexed-indirect_addressing
-		if byte == 0x23:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
+		addr = _ADDR_MODE[byte](self, addr)
 		
-		# Indirect indexed y
-		# https://www.c64-wiki.com/wiki/Indirect-indexed_addressing
-		if byte == 0x33:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
-			addr += self.y
-				
 		# Shift value in memory
 		old_data = self.mem.read(addr)
-		self.mem.write(addr, ((old_data << 1) + self.flag.isset(Flag.C)) % 0x100)
-		new_data = self.mem.read(addr)
+		new_data = ((old_data << 1) + (self.p & C)) & 0xFF
+		self.mem.write(addr, new_data)
 			
 		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		self.flag.clear(Flag.C)
+		self.p &= _NZC_CLR
 
 		if old_data & 0x80:
-			self.flag.set(Flag.C)
+			self.p |= C
 			
 		# Exec AND
 		self.acc &= new_data
 					
-		if self.acc == 0:
-			self.flag.set(Flag.Z)
-		
-		if self.acc >= 128:
-			self.flag.set(Flag.N)
+		self._nz(self.acc)
 				
 		return self.pc + instr[1], self.cycles + instr[2]
 	
 	def instruction_iRRA(self, byte, instr, addr):
 		# Combine ROR and ADC
-		# Add x register
-		if byte == 0x77 or byte == 0x7F or byte == 0x63:
-			addr += self.x
-			# Wrap zero page
-			if byte == 0x77:
-				addr %= 0x100
-		
-		# Add y register
-		if byte == 0x7B:
-			addr += self.y
-		
-		# Indexed indirect x
-		# https://www.c64-wiki.com/wiki/Indexed-indirect_addressing
-		if byte == 0x63:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
+		addr = _ADDR_MODE[byte](self, addr)
 		
-		# Indirect indexed y
-		# https://www.c64-wiki.com/wiki/Indirect-indexed_addressing
-		if byte == 0x73:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
-			addr += self.y
-				
 		# Shift value in memory
 		old_data = self.mem.read(addr)
-		self.mem.write(addr, (old_data >> 1) + (self.flag.isset(Flag.C) << 7))
-		new_data = self.mem.read(addr)
+		new_data = (old_data >> 1) + ((self.p & C) << 7)
+		self.mem.write(addr, new_data)
 		
+		# The carry shifted out feeds the ADC. Unlike _RMW_OPS["ROR"], which
+		# replaces C with bit 0, bit 0 is only ORed into C here
 		if old_data & 0x01:
-			self.flag.set(Flag.C)
-			
-		if new_data == 0:
-			self.flag.set(Flag.Z)
-		
-		if new_data & 0x80:
-			self.flag.set(Flag.N)
-		
-		old_acc = self.acc
-		self.acc += new_data + self.flag.isset(Flag.C)
-		
-		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		self.flag.clear(Flag.C)
-		self.flag.clear(Flag.V)
-		
-		if ((old_acc^self.acc) & (new_data^self.acc)) & 0x80:
-			self.flag.set(Flag.V)
+			self.p |= C
 		
-		if self.acc >= 256:
-			self.flag.set(Flag.C)
-		
-		if self.acc & 128:
-			self.flag.set(Flag.N)
-			
-		self.acc %= 0x100
+		self._adc_core(new_data)
 		
-		if self.acc == 0:
-			self.flag.set(Flag.Z)
-				
 		return self.pc + instr[1], self.cycles + instr[2]
 		
 	
 	def instruction_iSAX(self, byte, instr, addr):
-		# Add y, zeropage
-		if byte == 0x97:
-			addr += self.y
-			addr %= 0x100
-		
-		# Indexed indirect x
-		# https://www.c64-wiki.com/wiki/Indexed-indirect_addressing
-		if byte == 0x83:
-			addr += self.x
-			
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
+		addr = _ADDR_MODE[byte](self, addr)
 		
 		# Store bitwise AND of acc and x
 		data = self.acc & self.x
@@ -1671,135 +731,287 @@ class CPU:
 	
 	def instruction_iSBC(self, byte, instr, data):
 		# This instruction uses #imm only
-		old_acc = self.acc
-		self.acc += ~data + self.flag.isset(Flag.C)
-		
-		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		self.flag.set(Flag.C) # This should be set before SBC is called, but doesn't seem to be
-		self.flag.clear(Flag.V)
-		
-		if self.acc < 0:
-			self.flag.clear(Flag.C)
-		
-		if self.acc & 128:
-			self.flag.set(Flag.N)
-			
-		self.acc %= 0x100
-		
-		if self.acc == 0:
-			self.flag.set(Flag.Z)
-			
-		if ((old_acc^self.acc) & ~(data^self.acc)) & 0x80:
-			self.flag.set(Flag.V)
+		self._sbc_core(data)
 			
 		return self.pc + instr[1], self.cycles + instr[2]
 	
 	def instruction_iSLO(self, byte, instr, addr):
 		# Combine ASL and ORA
 		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		self.flag.clear(Flag.C)
-		
-		# Add x register
-		if byte == 0x17 or byte == 0x1F or byte == 0x03:
-			addr += self.x
-			# Wrap zero page
-			if byte == 0x17:
-				addr %= 0x100
-		
-		# Add y register
-		if byte == 0x1B:
-			addr += self.y
-			
-		# Indexed indirect x
-		# https://www.c64-wiki.com/wiki/Indexed-indirect_addressing
-		if byte == 0x03:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
+		self.p &= _NZC_CLR
 		
-		# Indirect indexed y
-		# https://www.c64-wiki.com/wiki/Indirect-indexed_addressing
-		if byte == 0x13:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
-			addr += self.y
+		addr = _ADDR_MODE[byte](self, addr)
 		
 		# Shift Memory
 		data = self.mem.read(addr)
 		if data & 0x80:
-			self.flag.set(Flag.C)
+			self.p |= C
 		
-		data = (data << 1) % 0x100
+		data = (data << 1) & 0xFF
 		
 		self.mem.write(addr, data)
 			
 		self.acc |= data
 		
-		if self.acc == 0:
-			self.flag.set(Flag.Z)
-		
-		if self.acc >= 128:
-			self.flag.set(Flag.N)
+		self._nz(self.acc)
 			
 		return self.pc + instr[1], self.cycles + instr[2]
 	
 	def instruction_iSRE(self, byte, instr, addr):
 		# Combine LSR and EOR
 		# Clear flags
-		self.flag.clear(Flag.N)
-		self.flag.clear(Flag.Z)
-		self.flag.clear(Flag.C)
-		
-		# Add x register
-		if byte == 0x57 or byte == 0x5F or byte == 0x43:
-			addr += self.x
-			# Wrap zero page
-			if byte == 0x57:
-				addr %= 0x100
-		
-		# Add y register
-		if byte == 0x5B:
-			addr += self.y
-			
-		# Indexed indirect x
-		# https://www.c64-wiki.com/wiki/Indexed-indirect_addressing
-		if byte == 0x43:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
+		self.p &= _NZC_CLR
+		
+		addr = _ADDR_MODE[byte](self, addr)
 		
-		# Indirect indexed y
-		# https://www.c64-wiki.com/wiki/Indirect-indexed_addressing
-		if byte == 0x53:
-			lower = self.mem.read(addr % 0x100)
-			upper = self.mem.read((addr + 1) % 0x100)
-			
-			addr = (upper << 8) + lower
-			addr += self.y
-				
 		# Shift value in memory
 		old_data = self.mem.read(addr)
-		self.mem.write(addr, old_data >> 1)
-		new_data = self.mem.read(addr)
+		new_data = old_data >> 1
+		self.mem.write(addr, new_data)
 
 		if old_data & 0x01:
-			self.flag.set(Flag.C)
+			self.p |= C
 			
 		# Exec XOR
 		self.acc ^= new_data
 					
-		if self.acc == 0:
-			self.flag.set(Flag.Z)
-		
-		if self.acc >= 0x80:
-			self.flag.set(Flag.N)
+		self._nz(self.acc)
 				
-		return self.pc + instr[1], self.cycles + instr[2]
\ No newline at end of file
+		return self.pc + instr[1], self.cycles + instr[2]
+
+## Specialized instructions
+#
+# The loads, stores, arithmetic and read-modify-write instructions below come
+# in up to eight addressing modes. Rather than selecting the mode on every
+# call, one handler per opcode is generated from the templates below, with the
+# addressing mode, length and cycle count of that opcode baked in.
+
+# Addressing mode of the 0bxxxxxx01 opcodes (ADC/AND/CMP/EOR/LDA/ORA/SBC/STA),
+# indexed by bits 2-4 of the opcode byte
+_ALU_MODES = ("indx", "zp", "imm", "abs", "indy", "zpx", "absy", "absx")
+
+# Addressing mode of the 0bxxxxxx00 and 0bxxxxxx10 opcodes, indexed the same way
+_OTHER_MODES = ("imm", "zp", "acc", "abs", None, "zpx", None, "absx")
+
+# LDX and STX index with y rather than x
+_Y_INDEXED = {"zpx": "zpy", "absx": "absy"}
+
+# Source turning the operand into an effective address
+_MODE_ADDR = {
+	"imm": "",
+	"acc": "",
+	"zp": "",
+	"zpx": """
+	addr = (addr + self.x) & 0xFF""",
+	"zpy": """
+	addr = (addr + self.y) & 0xFF""",
+	"abs": "",
+	"absx": """
+	addr = (addr + self.x) & 0xFFFF""",
+	"absy": """
+	addr = (addr + self.y) & 0xFFFF""",
+	"indx": """
+	addr = indx(addr, self.mem, self.x)""",
+	"indy": """
+	addr = indy(addr, self.mem, self.y) & 0xFFFF""",
+}
+
+# Source loading the operand value into data
+_MODE_DATA = {
+	"imm": "data = addr",
+	"acc": "data = self.acc",
+	"zp": "data = self.mem.read(addr)",
+	"zpx": "data = self.mem.read(addr)",
+	"zpy": "data = self.mem.read(addr)",
+	"abs": "data = self.mem.read(addr)",
+	"absx": "data = self.mem.read(addr)",
+	"absy": "data = self.mem.read(addr)",
+	"indx": "data = self.mem.read(addr)",
+	"indy": "data = self.mem.read(addr)",
+}
+
+# Source storing the result of a read-modify-write instruction
+_MODE_WRITE_BACK = {
+	"acc": "self.acc = result",
+	"zp": "self.mem.write(addr, result)",
+	"zpx": "self.mem.write(addr, result)",
+	"abs": "self.mem.write(addr, result)",
+	"absx": "self.mem.write(addr, result)",
+}
+
+# Whether the indexing of the effective address crossed a page boundary, which
+# is when the low byte wrapped around to below the index
+_MODE_PAGE_CROSSED = {
+	"absx": "((addr & 0xFF) < self.x)",
+	"absy": "((addr & 0xFF) < self.y)",
+	"indy": "((addr & 0xFF) < self.y)",
+}
+
+# Source of the operation itself, acting on data
+_ALU_OPS = {
+	"ADC": """
+	self._adc_core(data)""",
+	"AND": """
+	self.acc &= data
+	self._nz(self.acc)""",
+	"BIT": """
+	self.p &= _NVZ_CLR
+	
+	if self.acc & data == 0:
+		self.p |= Z
+	
+	# N and V are copied from bits 7 and 6
+	self.p |= data & (N | V)""",
+	"CMP": """
+	# Clear flags
+	self.p &= _NZC_CLR
+	
+	if self.acc >= data:
+		self.p |= C
+	
+	if self.acc == data:
+		self.p |= Z
+	
+	if ((self.acc - data) & 0xFF) & 128:
+		self.p |= N""",
+	"CPX": """
+	# Clear flags
+	self.p &= _NZC_CLR
+	
+	if self.x >= data:
+		self.p |= C
+	
+	if self.x == data:
+		self.p |= Z
+	
+	if (self.x - data) & 128:
+		self.p |= N""",
+	"CPY": """
+	# Clear flags
+	self.p &= _NZC_CLR
+	
+	if self.y >= data:
+		self.p |= C
+	
+	if self.y == data:
+		self.p |= Z
+	
+	if (self.y - data) & 128:
+		self.p |= N""",
+	"EOR": """
+	self.acc ^= data
+	self._nz(self.acc)""",
+	"LDA": """
+	self.acc = data
+	self._nz(self.acc)""",
+	"LDX": """
+	self.x = data
+	self._nz(self.x)""",
+	"LDY": """
+	self.y = data
+	self._nz(self.y)""",
+	"ORA": """
+	self.acc |= data
+	self._nz(self.acc)""",
+	"SBC": """
+	self._sbc_core(data)""",
+}
+
+# Source of the store instructions, writing to addr
+_STORE_OPS = {
+	"STA": "self.mem.write(addr, self.acc)",
+	"STX": "self.mem.write(addr, self.x)",
+	"STY": "self.mem.write(addr, self.y)",
+}
+
+# Source of the read-modify-write instructions, turning data into result
+_RMW_OPS = {
+	"ASL": """
+	result = (data << 1) & 0xFF
+	
+	# Bit 7 is shifted into the carry
+	self.p = (self.p & 0xFE) | (data >> 7)
+	self._nz(result)""",
+	"DEC": """
+	result = (data - 1) & 0xFF
+	self._nz(result)""",
+	"INC": """
+	result = (data + 1) & 0xFF
+	self._nz(result)""",
+	"LSR": """
+	result = data >> 1
+	
+	# Bit 0 is shifted into the carry
+	self.p = (self.p & 0xFE) | (data & 0x01)
+	self._nz(result)""",
+	"ROL": """
+	result = ((data << 1) | (self.p & C)) & 0xFF
+	
+	# Bit 7 is shifted into the carry
+	self.p = (self.p & 0xFE) | (data >> 7)
+	self._nz(result)""",
+	"ROR": """
+	result = (data >> 1) | ((self.p & C) << 7)
+	
+	# Bit 0 is shifted into the carry
+	self.p = (self.p & 0xFE) | (data & 0x01)
+	self._nz(result)""",
+}
+
+_HANDLER_TEMPLATE = """
+def {name}(self, byte, instr, addr):{addr}
+	{data}
+	{op}
+	
+	return self.pc + {length}, self.cycles + {cycles}{page_crossed}
+"""
+
+def _mode_of(byte, mnemonic):
+	"""Addressing mode of opcode byte"""
+	if byte & 0x01:
+		return _ALU_MODES[(byte >> 2) & 0x07]
+	
+	mode = _OTHER_MODES[(byte >> 2) & 0x07]
+	if mnemonic in ("LDX", "STX"):
+		mode = _Y_INDEXED.get(mode, mode)
+	
+	return mode
+
+def _specialize(byte):
+	"""Generate the handler for a single opcode, returning its name"""
+	mnemonic, length, cycles, page_cycles = opcodes_table[byte]
+	mode = _mode_of(byte, mnemonic)
+	name = f"instruction_{mnemonic}_{byte:02X}"
+	
+	if mnemonic in _STORE_OPS:
+		data = ""
+		op = _STORE_OPS[mnemonic]
+	elif mnemonic in _RMW_OPS:
+		data = _MODE_DATA[mode]
+		op = _RMW_OPS[mnemonic].strip() + "\n\t" + _MODE_WRITE_BACK[mode]
+	else:
+		data = _MODE_DATA[mode]
+		op = _ALU_OPS[mnemonic]
+	
+	page_crossed = ""
+	if page_cycles:
+		# ADC checks the indexing itself, the others compare against the pc page
+		if mnemonic == "ADC":
+			page_crossed = f" + {_MODE_PAGE_CROSSED[mode]}"
+		else:
+			page_crossed = " + ((self.pc ^ addr) & 0xFF00 != 0)"
+	
+	source = _HANDLER_TEMPLATE.format(name=name, addr=_MODE_ADDR[mode], data=data,
+		op=op.strip(), length=length, cycles=cycles, page_crossed=page_crossed)
+	
+	namespace = {}
+	exec(source, globals(), namespace)
+	setattr(CPU, name, namespace[name])
+	
+	return name
+
+# Opcode byte -> name of its specialized handler
+SPECIALIZED = {}
+for _byte, _instr in opcodes.items():
+	if _instr[0] in _ALU_OPS or _instr[0] in _STORE_OPS or _instr[0] in _RMW_OPS:
+		SPECIALIZED[_byte] = _specialize(_byte)
@@ -1,10 +1,12 @@
 import re
+import struct
 
 from opcodes6502 import opcodes
 import cpu as processor
+import ppu as graphics
 
 def format_log(cpu):
-	return f"{cpu.pc:04X} A:{cpu.acc:02X} X:{cpu.x:02X} Y:{cpu.y:02X} P:{cpu.flag.get_byte():02X} SP:{cpu.sp:02X} CYC:{cpu.cycles}\n"
+	return f"{cpu.pc:04X} A:{cpu.acc:02X} X:{cpu.x:02X} Y:{cpu.y:02X} P:{cpu.p:02X} SP:{cpu.sp:02X} CYC:{cpu.cycles}\n"
 
 """
     iNES format:
@@ -43,41 +45,50 @@ def load_image(name):
 		
 	return raw
 
+def parse_header(raw):
+	"""Unpack the 16 byte iNES header into a dict of its fields"""
+	const, prg_size, chr_size, flags6, flags7, flags8, flags9 = struct.unpack_from("<4s6B", raw)
+	
+	return {
+		"const": const,
+		"prg_size": prg_size,
+		"chr_size": chr_size,
+		"mirroring": flags6 & 0b00000001,
+		"persistent_mem": flags6 & 0b00000010,
+		"trainer": (flags6 & 0b00000100) >> 2,
+		"mirroring_ignore": flags6 & 0b00001000,
+		"vs_unisystem": flags7 & 0b00000001,
+		"playchoice": flags7 & 0b00000010,
+		"nes2": (flags7 & 0b00001100) == 0b00001000,
+		"mapper": (flags7 & 0b11110000) | (flags6 >> 4),
+		"prg_ram_size": flags8,
+		"tv_mode": flags9 & 0b00000001,
+	}
+
 filename = "dk.nes"
 raw = load_image(filename)
+header = parse_header(raw)
 
-# Parse header data
-const = raw[0:4]
-prg_size = raw[4]
-chr_size = raw[5]
-flag_mirroring = raw[6] & 0b00000001
-flag_persistent_mem = raw[6] & 0b00000010
-flag_trainer = raw[6] & 0b00001000
-flag_mirroring_ignore = raw[6] & 0b00001000
-flag_vs_unisystem = raw[7] & 0b00000001
-flag_playchoice = raw[7] & 0b00000010
-flag_nes2 = raw[7] & 0b00001100
-flag_mapper = (raw[7] & 0b11110000) << 4 + raw[6] & 0b11110000
-flag_prg_ram_size = raw[8]
-flag_tv_mode = raw[9] & 0b00000001
-
-prg_start = 16 + flag_trainer * 512
+prg_size = header["prg_size"]
+flag_mapper = header["mapper"]
+
+prg_start = 16 + header["trainer"] * 512
 prg_len = 16384 * prg_size
 
 chr_start = prg_start + prg_len
-chr_len = 8192 * chr_size
+chr_len = 8192 * header["chr_size"]
 
 PRG = raw[prg_start:prg_start+prg_len]
 CHR = raw[chr_start:chr_start+chr_len]
 
 print(f"Header:\n", \
-	  f"Header constant: {const.decode('UTF-8')}\n", \
-	  f"Image type: {'NES 2.0' if flag_nes2 else 'iNES'}\n", \
+	  f"Header constant: {header['const'].decode('UTF-8')}\n", \
+	  f"Image type: {'NES 2.0' if header['nes2'] else 'iNES'}\n", \
 	  f"PRG ROM Size: {prg_len/1024} KiB\n", \
 	  f"CHR ROM Size: {chr_len/1024} KiB\n", \
-	  f"PRG RAM Size: {flag_prg_ram_size/1024 if flag_prg_ram_size else 'n.a.'}\n",\
-	  f"Persistent Memory: {'Yes' if flag_persistent_mem else 'No'}\n", \
-	  f"Mirroring mode: {flag_mirroring}\n", \
+	  f"PRG RAM Size: {header['prg_ram_size']/1024 if header['prg_ram_size'] else 'n.a.'}\n",\
+	  f"Persistent Memory: {'Yes' if header['persistent_mem'] else 'No'}\n", \
+	  f"Mirroring mode: {header['mirroring']}\n", \
 	  f"Mapper: {flag_mapper} ")
 
 if flag_mapper != 0:
@@ -85,17 +96,19 @@ if flag_mapper != 0:
 
 # Map memory
 raw_mem = bytearray(0xFFFF+1)
-raw_mem[0x8000:] = PRG
-if prg_size == 1:
-	raw_mem[0xC000:] = PRG
+raw_mem[0x8000:0x8000+prg_len] = PRG
 	
 #raw_mem[0x2002] = 0x80 # Negative num for testing purposes
 
-mem = processor.Memory(raw_mem)
+# A single 16KiB PRG bank is mirrored into 0xC000 - 0xFFFF by Memory, rather than copied
+mem = processor.Memory(raw_mem, is_mirror = prg_size == 1)
 
 cpu = processor.CPU(mem)
 if filename == "nestest.nes":
 	cpu.pc = 0xC000
+
+# Emulate a frame worth of CPU cycles per call, 1 CPU cycle is approx. 3 PPU cycles
+frame_cycles = graphics.CYCLES_PER_FRAME // 3
 	
 #log = open("nestest.log", "r")
 
@@ -113,7 +126,7 @@ while True:
 		print(logline)
 		break
 	"""
-	cpu.run()
+	cpu.run_until(cpu.cycles + frame_cycles)
 	# loc = 0x00	# This is only required for the first n tests
 	"""loc = 0x02
 
@@ -305,4 +305,10 @@ opcodes = {
 	0xD2: ("iJAM", 1, 0, 0),
 	0xF2: ("iJAM", 1, 0, 0)
 	
-}
\ No newline at end of file
+}
+
+# The same table indexed directly by opcode byte, None for unknown opcodes
+opcodes_table = tuple(opcodes.get(byte) for byte in range(0x100))
+
+# Instruction length per opcode byte, 0 for unknown opcodes
+lengths = bytes(instr[1] if instr else 0 for instr in opcodes_table)
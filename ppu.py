@@ -50,14 +50,30 @@ class PPU:
 		elif addr == 0x2001:
 			self.mask = data
 			
-	def run(self, cpu):
-		if self.cycles % CYCLES_PER_FRAME > CYCLE_POSTRENDER:
-			# Post render and VBlank
+	def advance(self, cpu, cycles = 1):
+		"""Advance the PPU by the given number of PPU cycles"""
+		if cycles <= 0:
+			return
+		
+		start = self.cycles
+		end = start + cycles
+		
+		# First VBlank start at or after the current cycle
+		vblank = start - start % CYCLES_PER_FRAME + CYCLE_VBLANK
+		if vblank < start:
+			vblank += CYCLES_PER_FRAME
+		
+		# Fire an NMI for every VBlank start we pass over
+		while vblank < end and self.control & 0x80:
+			self.status |= 0x80
+			self.cycles = vblank
+			cpu.handle_nmi()
+			vblank += CYCLES_PER_FRAME
+		
+		# The VBlank flag is set after the post render line, and cleared otherwise
+		if (end - 1) % CYCLES_PER_FRAME > CYCLE_POSTRENDER:
 			self.status |= 0x80
-			
-			if self.cycles % CYCLES_PER_FRAME == CYCLE_VBLANK and self.control & 0x80:
-				cpu.handle_nmi()
 		else:
 			self.status &= ~0x80
 		
-		self.cycles += 1
\ No newline at end of file
+		self.cycles = end